@@ -1,19 +1,29 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
-from zoneinfo import ZoneInfo
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 import os
 import base64
+import io
 import plotly.express as px
 from streamlit_option_menu import option_menu
 import streamlit.components.v1 as components
-
-# Egypt timezone
-EGYPT_TZ = ZoneInfo("Africa/Cairo")
-
-# File to store data
-DATA_FILE = 'attendance_data.csv'
-BACKUP_EXCEL = 'attendance_backup.xlsx'
+import json
+import re
+import threading
+import time
+
+# Site configuration file (optional). Maps site id -> settings, e.g.
+# {"cairo": {"name": "Cairo", "timezone": "Africa/Cairo", "shift_start_hour": 16, "shift_end_hour": 4}}
+# A shift_end_hour at or before shift_start_hour means the shift runs past midnight
+SITES_FILE = 'sites.json'
+# Each site other than the default one stores its data under DATA_DIR/<site id>/
+DATA_DIR = 'sites'
+DEFAULT_SITE_ID = 'default'
+SITE_ID_PATTERN = re.compile(r'[A-Za-z0-9_-]+')
+DEFAULT_SITE = {'name': 'Main Site', 'timezone': 'Africa/Cairo', 'shift_start_hour': 16, 'shift_end_hour': 4}
+# Seconds a site's data may stay unused in memory before it is evicted
+SITE_IDLE_TIMEOUT = 30 * 60
 
 # Define expected columns
 EXPECTED_COLUMNS = ['User', 'Date', 'CheckIn', 'CheckOut', 
@@ -24,33 +34,160 @@ EXPECTED_COLUMNS = ['User', 'Date', 'CheckIn', 'CheckOut',
 TIME_COLUMNS = ['CheckIn', 'CheckOut', 'Break1Start', 'Break1End', 
                 'Break2Start', 'Break2End', 'Break3Start', 'Break3End']
 
+# Load site configuration, falling back to a single default site
+def load_sites():
+    sites = {}
+    if os.path.exists(SITES_FILE):
+        with open(SITES_FILE) as f:
+            sites = json.load(f)
+        if not isinstance(sites, dict):
+            raise ValueError(f"{SITES_FILE} must contain a JSON object mapping site ids to settings")
+    if not sites:
+        sites = {DEFAULT_SITE_ID: {}}
+    resolved = {}
+    for site_id, settings in sites.items():
+        if not isinstance(settings, dict):
+            raise ValueError(f"Settings for site {site_id!r} in {SITES_FILE} must be a JSON object")
+        defaults = DEFAULT_SITE if site_id == DEFAULT_SITE_ID else {**DEFAULT_SITE, 'name': site_id}
+        resolved[site_id] = {**defaults, **settings}
+        validate_site(site_id, resolved[site_id])
+    return resolved
+
+# Check a site's id, timezone and shift hours, naming the site in any error
+def validate_site(site_id, site):
+    if not SITE_ID_PATTERN.fullmatch(site_id):
+        raise ValueError(f"Invalid site id {site_id!r} in {SITES_FILE}: use only letters, digits, '-' and '_'")
+    try:
+        ZoneInfo(site['timezone'])
+    except (ZoneInfoNotFoundError, ValueError, TypeError):
+        raise ValueError(f"Invalid timezone {site['timezone']!r} for site {site_id!r} in {SITES_FILE}")
+    for key in ('shift_start_hour', 'shift_end_hour'):
+        hour = site[key]
+        if isinstance(hour, bool) or not isinstance(hour, int) or not 0 <= hour <= 23:
+            raise ValueError(f"Invalid {key} {hour!r} for site {site_id!r} in {SITES_FILE}: use a whole hour from 0 to 23")
+    if site['shift_start_hour'] == site['shift_end_hour']:
+        raise ValueError(f"Site {site_id!r} in {SITES_FILE} has the same shift_start_hour and shift_end_hour")
+
+# Storage paths for a site; the default site keeps the original file locations
+def get_site_files(site_id):
+    if site_id == DEFAULT_SITE_ID:
+        return 'attendance_data.csv', 'attendance_backup.xlsx'
+    site_dir = os.path.join(DATA_DIR, site_id)
+    return os.path.join(site_dir, 'attendance_data.csv'), os.path.join(site_dir, 'attendance_backup.xlsx')
+
 # Load data and ensure all columns exist with correct dtypes
-if os.path.exists(DATA_FILE):
-    df = pd.read_csv(DATA_FILE)
-    for col in EXPECTED_COLUMNS:
-        if col not in df.columns:
-            if col == 'Active':
-                df[col] = True
-            elif col in TIME_COLUMNS:
-                df[col] = pd.NA
-            else:
-                df[col] = pd.NA
-    # Convert time columns to string to match TextColumn
-    for col in TIME_COLUMNS:
-        df[col] = df[col].astype("string").fillna(pd.NA)
-else:
-    # Initialize with string dtype for time columns
-    dtypes = {col: "string" for col in TIME_COLUMNS}
-    dtypes.update({'User': 'string', 'Date': 'string', 'TotalHours': 'float64', 
-                   'BreakDuration': 'float64', 'Active': 'boolean'})
-    df = pd.DataFrame(columns=EXPECTED_COLUMNS).astype(dtypes)
+def load_data(data_file):
+    if os.path.exists(data_file):
+        df = pd.read_csv(data_file)
+        for col in EXPECTED_COLUMNS:
+            if col not in df.columns:
+                if col == 'Active':
+                    df[col] = True
+                elif col in TIME_COLUMNS:
+                    df[col] = pd.NA
+                else:
+                    df[col] = pd.NA
+        # Convert time columns to string to match TextColumn
+        for col in TIME_COLUMNS:
+            df[col] = df[col].astype("string").fillna(pd.NA)
+    else:
+        # Initialize with string dtype for time columns
+        dtypes = {col: "string" for col in TIME_COLUMNS}
+        dtypes.update({'User': 'string', 'Date': 'string', 'TotalHours': 'float64', 
+                       'BreakDuration': 'float64', 'Active': 'boolean'})
+        df = pd.DataFrame(columns=EXPECTED_COLUMNS).astype(dtypes)
+    return df
+
+# Modification time of a data file, or None if it does not exist yet
+def get_mtime(data_file):
+    try:
+        return os.stat(data_file).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+# In-memory data for all sites served by this process, loaded on first use
+# and evicted after SITE_IDLE_TIMEOUT seconds without access. A site is reloaded
+# whenever its CSV changes on disk, so edits made by other processes or by hand
+# are picked up. Concurrent saves to the same site still follow last-write-wins.
+class SiteStore:
+    def __init__(self, idle_timeout):
+        self.idle_timeout = idle_timeout
+        self.lock = threading.Lock()
+        self.frames = {}
+        self.mtimes = {}
+        self.last_access = {}
+
+    def evict_idle(self):
+        cutoff = time.monotonic() - self.idle_timeout
+        for site_id in [s for s, t in self.last_access.items() if t < cutoff]:
+            del self.frames[site_id]
+            del self.mtimes[site_id]
+            del self.last_access[site_id]
+
+    # Returns a copy so unsaved edits in one session never leak into the shared data
+    def get(self, site_id, data_file):
+        with self.lock:
+            self.evict_idle()
+            mtime = get_mtime(data_file)
+            if site_id not in self.frames or self.mtimes[site_id] != mtime:
+                self.frames[site_id] = load_data(data_file)
+                self.mtimes[site_id] = mtime
+            self.last_access[site_id] = time.monotonic()
+            return self.frames[site_id].copy()
+
+    # mtime must be read right after writing the CSV, so a later write by another process still triggers a reload
+    def put(self, site_id, mtime, df):
+        with self.lock:
+            self.frames[site_id] = df.copy()
+            self.mtimes[site_id] = mtime
+            self.last_access[site_id] = time.monotonic()
+
+# Shared across all sessions of this process
+@st.cache_resource
+def get_site_store():
+    return SiteStore(SITE_IDLE_TIMEOUT)
+
+SITES = load_sites()
+
+# Site selection is kept in sync with ?site=<id> in the URL, so links point at the shown site
+def sync_site_query_param():
+    st.query_params['site'] = st.session_state.site_id
+
+site_ids = list(SITES)
+requested_site = st.query_params.get('site')
+if requested_site in site_ids:
+    st.session_state.site_id = requested_site
+elif st.session_state.get('site_id') not in site_ids:
+    st.session_state.site_id = site_ids[0]
+with st.sidebar:
+    SITE_ID = st.selectbox(
+        "Site",
+        options=site_ids,
+        format_func=lambda site_id: SITES[site_id]['name'],
+        key='site_id',
+        on_change=sync_site_query_param,
+    )
+if requested_site != SITE_ID:
+    st.query_params['site'] = SITE_ID
+SITE = SITES[SITE_ID]
+
+# Per-site settings for this run
+SITE_TZ = ZoneInfo(SITE['timezone'])
+SHIFT_START_HOUR = SITE['shift_start_hour']
+SHIFT_END_HOUR = SITE['shift_end_hour']
+DATA_FILE, BACKUP_EXCEL = get_site_files(SITE_ID)
+
+df = get_site_store().get(SITE_ID, DATA_FILE)
 
 # Function to save data to CSV and Excel
 def save_data():
     global df
+    os.makedirs(os.path.dirname(DATA_FILE) or '.', exist_ok=True)
     df.to_csv(DATA_FILE, index=False)
+    mtime = get_mtime(DATA_FILE)
     with pd.ExcelWriter(BACKUP_EXCEL, engine='xlsxwriter') as writer:
         df.to_excel(writer, index=False, sheet_name='DataMatrix')
+    get_site_store().put(SITE_ID, mtime, df)
 
 # Function to restore data from Excel
 def restore_from_excel(uploaded_file):
@@ -87,10 +224,25 @@ def restore_from_excel(uploaded_file):
         st.error(f"Error restoring data: {str(e)}")
         return False
 
-# Function to calculate shift date (shift starts at 4 PM, ends at 12 AM next day, but date is the start day)
+# Function to check whether a time falls after midnight in an overnight shift (e.g. 4 PM - 4 AM);
+# same-day shifts (e.g. 8 AM - 5 PM) never roll over
+def is_after_midnight(dt):
+    if SHIFT_END_HOUR > SHIFT_START_HOUR:
+        return False
+    return dt.hour < SHIFT_END_HOUR or (dt.hour == SHIFT_END_HOUR and dt.minute == 0)
+
+# Function to find the hour before which recorded times belong to the next day of an overnight shift,
+# leaving room for overtime past the end hour: noon (any AM time) when the off-duty gap contains it,
+# otherwise the middle of the gap
+def get_rollover_hour():
+    if SHIFT_END_HOUR <= 12 <= SHIFT_START_HOUR:
+        return 12
+    return (SHIFT_END_HOUR + SHIFT_START_HOUR) // 2
+
+# Function to calculate shift date (date is the day the shift started)
 def get_shift_date():
-    now = datetime.now(EGYPT_TZ)
-    if now.hour < 4 or (now.hour == 4 and now.minute == 0):
+    now = datetime.now(SITE_TZ)
+    if is_after_midnight(now):
         return (now - timedelta(days=1)).date()
     else:
         return now.date()
@@ -107,8 +259,8 @@ def parse_time(time_str, shift_date):
         return None
     try:
         dt = datetime.strptime(f"{shift_date} {time_str}", "%Y-%m-%d %I:%M %p")
-        dt = dt.replace(tzinfo=EGYPT_TZ)
-        if dt.hour < 16 and time_str.endswith("AM"):
+        dt = dt.replace(tzinfo=SITE_TZ)
+        if SHIFT_END_HOUR < SHIFT_START_HOUR and dt.hour < get_rollover_hour():
             dt += timedelta(days=1)
         return dt
     except ValueError:
@@ -296,9 +448,10 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-# Initialize session state for user selection
-if 'selected_user' not in st.session_state:
+# Initialize session state for user selection, resetting it when the site changes
+if 'selected_user' not in st.session_state or st.session_state.get('selected_site') != SITE_ID:
     st.session_state.selected_user = None
+    st.session_state.selected_site = SITE_ID
 
 # Sidebar for navigation
 with st.sidebar:
@@ -328,7 +481,7 @@ if selected == "User Portal":
                 st.warning("No active users available. Please contact the admin to add users.")
                 user_name = None
             else:
-                user_name = st.selectbox("Select your identity", options=active_users, placeholder="Choose User...", key="user_select")
+                user_name = st.selectbox("Select your identity", options=active_users, placeholder="Choose User...", key=f"user_select_{SITE_ID}")
                 submitted = st.form_submit_button("Enter")  # Visible button labeled "Enter"
                 if submitted:
                     if user_name:
@@ -394,7 +547,7 @@ if selected == "User Portal":
 
                 with col1:
                     if st.button("Check In", key=f"check_in_{row_index}") and pd.isna(df.at[row_index, 'CheckIn']):
-                        df.at[row_index, 'CheckIn'] = format_time(datetime.now(EGYPT_TZ))
+                        df.at[row_index, 'CheckIn'] = format_time(datetime.now(SITE_TZ))
                         total_hours, break_duration = calculate_times(df.loc[row_index], shift_date)
                         df.at[row_index, 'TotalHours'] = total_hours
                         df.at[row_index, 'BreakDuration'] = break_duration
@@ -404,7 +557,7 @@ if selected == "User Portal":
                     for i in range(1, 4):
                         if st.button(f"Break {i} Start", key=f"break_{i}_start_{row_index}") and pd.isna(df.at[row_index, f'Break{i}Start']) and pd.notna(df.at[row_index, 'CheckIn']):
                             if i == 1 or (pd.notna(df.at[row_index, f'Break{i-1}End'])):
-                                df.at[row_index, f'Break{i}Start'] = format_time(datetime.now(EGYPT_TZ))
+                                df.at[row_index, f'Break{i}Start'] = format_time(datetime.now(SITE_TZ))
                                 total_hours, break_duration = calculate_times(df.loc[row_index], shift_date)
                                 df.at[row_index, 'TotalHours'] = total_hours
                                 df.at[row_index, 'BreakDuration'] = break_duration
@@ -414,7 +567,7 @@ if selected == "User Portal":
                 with col2:
                     for i in range(1, 4):
                         if st.button(f"Break {i} End", key=f"break_{i}_end_{row_index}") and pd.notna(df.at[row_index, f'Break{i}Start']) and pd.isna(df.at[row_index, f'Break{i}End']):
-                            df.at[row_index, f'Break{i}End'] = format_time(datetime.now(EGYPT_TZ))
+                            df.at[row_index, f'Break{i}End'] = format_time(datetime.now(SITE_TZ))
                             total_hours, break_duration = calculate_times(df.loc[row_index], shift_date)
                             df.at[row_index, 'TotalHours'] = total_hours
                             df.at[row_index, 'BreakDuration'] = break_duration
@@ -423,7 +576,7 @@ if selected == "User Portal":
 
                     if st.button("Check Out", key=f"check_out_{row_index}") and pd.notna(df.at[row_index, 'CheckIn']) and pd.isna(df.at[row_index, 'CheckOut']):
                         if all(pd.notna(df.at[row_index, f'Break{i}End']) for i in range(1, 4) if pd.notna(df.at[row_index, f'Break{i}Start'])):
-                            df.at[row_index, 'CheckOut'] = format_time(datetime.now(EGYPT_TZ))
+                            df.at[row_index, 'CheckOut'] = format_time(datetime.now(SITE_TZ))
                             total_hours, break_duration = calculate_times(df.loc[row_index], shift_date)
                             df.at[row_index, 'TotalHours'] = total_hours
                             df.at[row_index, 'BreakDuration'] = break_duration
@@ -469,7 +622,7 @@ elif selected == "Admin Dashboard":
         # Excel upload for data restoration
         st.markdown('<div class="card">', unsafe_allow_html=True)
         st.subheader("Restore Data from Excel")
-        uploaded_file = st.file_uploader("Upload Excel file to restore data", type=["xlsx"])
+        uploaded_file = st.file_uploader("Upload Excel file to restore data", type=["xlsx"], key=f"restore_upload_{SITE_ID}")
         if uploaded_file:
             if restore_from_excel(uploaded_file):
                 st.success("Data restored successfully from Excel!")
@@ -480,8 +633,8 @@ elif selected == "Admin Dashboard":
         st.markdown('<div class="card">', unsafe_allow_html=True)
         st.subheader("Edit Data Matrix")
         # Filter options
-        filter_user = st.selectbox("Filter by User", options=['All'] + sorted(df['User'].unique().tolist()), key='filter_user')
-        filter_date = st.selectbox("Filter by Date", options=['All'] + sorted(df['Date'].unique().tolist()), key='filter_date')
+        filter_user = st.selectbox("Filter by User", options=['All'] + sorted(df['User'].unique().tolist()), key=f'filter_user_{SITE_ID}')
+        filter_date = st.selectbox("Filter by Date", options=['All'] + sorted(df['Date'].unique().tolist()), key=f'filter_date_{SITE_ID}')
         
         filtered_df = df
         if filter_user != 'All':
@@ -538,12 +691,12 @@ elif selected == "Admin Dashboard":
         # Edit User Session
         st.markdown('<div class="card">', unsafe_allow_html=True)
         st.subheader("Edit User Session")
-        edit_user = st.selectbox("Select User to Edit Session", options=['None'] + sorted(df['User'].unique().tolist()), key='edit_user')
+        edit_user = st.selectbox("Select User to Edit Session", options=['None'] + sorted(df['User'].unique().tolist()), key=f'edit_user_{SITE_ID}')
         if edit_user != 'None':
             user_sessions = df[df['User'] == edit_user]
             if not user_sessions.empty:
                 session_dates = sorted(user_sessions['Date'].unique().tolist())
-                edit_date = st.selectbox("Select Session Date", options=session_dates, key='edit_date')
+                edit_date = st.selectbox("Select Session Date", options=session_dates, key=f'edit_date_{SITE_ID}')
                 session_row = user_sessions[user_sessions['Date'] == edit_date].iloc[-1]
                 session_index = session_row.name
 
@@ -639,7 +792,7 @@ elif selected == "Admin Dashboard":
         # User management: Remove user
         st.markdown('<div class="card">', unsafe_allow_html=True)
         st.subheader("Remove User")
-        remove_user = st.selectbox("Select User to Remove", options=['None'] + sorted(df['User'].unique().tolist()), key='remove_user')
+        remove_user = st.selectbox("Select User to Remove", options=['None'] + sorted(df['User'].unique().tolist()), key=f'remove_user_{SITE_ID}')
         action = st.selectbox("Action", options=["Keep User", "Delete User (Keep Data)", "Delete User and Data"], key='user_action')
         
         if st.button("Execute Action") and remove_user != 'None':
@@ -660,12 +813,12 @@ elif selected == "Admin Dashboard":
 
         # Download Excel
         def get_excel_download_link(df):
-            with pd.ExcelWriter('attendance.xlsx', engine='xlsxwriter') as writer:
+            # Build the workbook in memory so concurrent sites don't share a temp file
+            buffer = io.BytesIO()
+            with pd.ExcelWriter(buffer, engine='xlsxwriter') as writer:
                 df.to_excel(writer, index=False, sheet_name='DataMatrix')
-            with open('attendance.xlsx', 'rb') as f:
-                data = f.read()
-            b64 = base64.b64encode(data).decode()
-            return f'<a href="data:application/octet-stream;base64,{b64}" download="attendance.xlsx">Download Data Matrix</a>'
+            b64 = base64.b64encode(buffer.getvalue()).decode()
+            return f'<a href="data:application/octet-stream;base64,{b64}" download="attendance_{SITE_ID}.xlsx">Download Data Matrix</a>'
         
         st.markdown('<div class="card">', unsafe_allow_html=True)
         st.markdown(get_excel_download_link(df), unsafe_allow_html=True)